@@ -20,19 +20,13 @@ def main():
         layout="wide"
     )
     
-    # Sidebar navigation
+    # Sidebar navigation, only the selected page runs
     st.sidebar.title("🗄️ ChromaDB Interface")
-    page = st.sidebar.selectbox(
-        "Choose Interface:",
-        ["💬 AI Chat Assistant", "🛠️ Admin Panel"]
-    )
-    
-    if page == "💬 AI Chat Assistant":
-        chat_view = ChatView()
-        chat_view.run()
-    elif page == "🛠️ Admin Panel":
-        admin_view = AdminView()
-        admin_view.run()
+    page = st.navigation([
+        st.Page(ChatView().run, title="AI Chat Assistant", icon="💬", url_path="chat", default=True),
+        st.Page(AdminView().run, title="Admin Panel", icon="🛠️", url_path="admin")
+    ])
+    page.run()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
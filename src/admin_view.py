@@ -1,6 +1,27 @@
 import streamlit as st
-from chroma_interaction_class import ChromaInteractionClass
+from chroma_cache import get_chroma_client, cached_query, cached_query_many, cached_count, cached_show_all_data, run_io
 import json
+import logging
+import math
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# Anzahl Dokumente pro store_data Aufruf beim Datei-Upload
+BATCH_SIZE = 256
+# Anzahl Dokumente pro Seite in der Datenbankübersicht
+PAGE_SIZE = 50
+# Ab dieser Textlänge wird das Zerlegen in Dokumente mit NumPy vektorisiert
+VECTORIZE_THRESHOLD = 10_000_000
+
+
+def split_documents(content):
+    """Zerlegt Text in Dokumente (eines pro Zeile) und verwirft leere Zeilen."""
+    lines = content.splitlines()
+    if len(content) > VECTORIZE_THRESHOLD:
+        arr = np.strings.strip(np.array(lines, dtype=np.dtypes.StringDType()))
+        return arr[arr != ''].tolist()
+    return [line for line in map(str.strip, lines) if line]
 
 
 class AdminView:
@@ -13,10 +34,12 @@ class AdminView:
         """Initialisiert den Streamlit Session State."""
         if 'connected' not in st.session_state:
             st.session_state.connected = False
-        if 'chroma_client' not in st.session_state:
-            st.session_state.chroma_client = None
+        if 'chroma_config' not in st.session_state:
+            st.session_state.chroma_config = None
         if 'documents_added' not in st.session_state:
             st.session_state.documents_added = 0
+        if 'show_all_data' not in st.session_state:
+            st.session_state.show_all_data = False
             
     def connection_sidebar(self):
         """Sidebar für Datenbankverbindung."""
@@ -32,9 +55,9 @@ class AdminView:
         # Verbinden Button
         if st.sidebar.button("Verbinden"):
             try:
-                self.chroma_client = ChromaInteractionClass(host, port, collection_name, client_name)
-                self.chroma_client.connect()
-                st.session_state.chroma_client = self.chroma_client
+                chroma_config = (host, int(port), collection_name, client_name)
+                self.chroma_client = get_chroma_client(*chroma_config)
+                st.session_state.chroma_config = chroma_config
                 st.session_state.connected = True
                 st.sidebar.success("✅ Verbindung erfolgreich!")
             except Exception as e:
@@ -49,8 +72,12 @@ class AdminView:
             
         # Trennen Button
         if st.session_state.connected and st.sidebar.button("Trennen"):
+            # Nur den Client dieser Verbindung aus dem Cache entfernen, nicht die anderer Konfigurationen
+            get_chroma_client.clear(*st.session_state.chroma_config)
             st.session_state.connected = False
-            st.session_state.chroma_client = None
+            st.session_state.chroma_config = None
+            st.session_state.show_all_data = False
+            self.chroma_client = None
             st.sidebar.info("Verbindung getrennt")
             
     def add_documents_section(self):
@@ -66,14 +93,23 @@ class AdminView:
         
         with tab1:
             st.subheader("Einzelnes Dokument hinzufügen")
-            single_doc = st.text_area("Dokumentinhalt:", height=150)
-            if st.button("Dokument hinzufügen", key="single_doc"):
-                if single_doc.strip():
+            with st.form("single_doc_form", clear_on_submit=True):
+                single_doc = st.text_area("Dokumentinhalt:", height=150)
+                submitted = st.form_submit_button("Dokument hinzufügen", key="single_doc")
+            if submitted:
+                single_doc = single_doc.strip()
+                if single_doc:
                     try:
-                        print(single_doc)
-                        st.session_state.chroma_client.store_data(single_doc)
-                        st.success("✅ Dokument erfolgreich hinzugefügt!")
-                        st.session_state.documents_added += 1
+                        log.debug("single_doc: %s", single_doc)
+                        added = run_io(self.chroma_client.store_one, single_doc)
+                        cached_query.clear()
+                        cached_query_many.clear()
+                        cached_count.clear()
+                        if added:
+                            st.success("✅ Dokument erfolgreich hinzugefügt!")
+                        else:
+                            st.info("ℹ️ Dokument ist bereits vorhanden.")
+                        st.session_state.documents_added += added
                     except Exception as e:
                         st.error(f"❌ Fehler beim Hinzufügen: {str(e)}")
                 else:
@@ -81,42 +117,45 @@ class AdminView:
                     
         with tab2:
             st.subheader("Multiple Dokumente hinzufügen")
-            multi_docs = st.text_area(
-                "Dokumente (ein Dokument pro Zeile):", 
-                height=200,
-                help="Geben Sie jedes Dokument in einer neuen Zeile ein."
-            )
-            if st.button("Dokumente hinzufügen", key="multi_docs"):
-                if multi_docs.strip():
-                    docs_list = [doc.strip() for doc in multi_docs.split('\n') if doc.strip()]
-                    if docs_list:
-                        try:
-                            st.session_state.chroma_client.store_data(docs_list)
-                            st.success(f"✅ {len(docs_list)} Dokumente erfolgreich hinzugefügt!")
-                            st.session_state.documents_added += len(docs_list)
-                        except Exception as e:
-                            st.error(f"❌ Fehler beim Hinzufügen: {str(e)}")
-                    else:
-                        st.warning("⚠️ Keine gültigen Dokumente gefunden.")
+            with st.form("multi_docs_form", clear_on_submit=True):
+                multi_docs = st.text_area(
+                    "Dokumente (ein Dokument pro Zeile):", 
+                    height=200,
+                    help="Geben Sie jedes Dokument in einer neuen Zeile ein."
+                )
+                submitted = st.form_submit_button("Dokumente hinzufügen", key="multi_docs")
+            if submitted:
+                docs_list = self.deduplicate(split_documents(multi_docs))
+                if docs_list:
+                    try:
+                        added = run_io(self.chroma_client.store_data, docs_list)
+                        cached_query.clear()
+                        cached_query_many.clear()
+                        cached_count.clear()
+                        self.report_added(added, len(docs_list))
+                    except Exception as e:
+                        st.error(f"❌ Fehler beim Hinzufügen: {str(e)}")
                 else:
                     st.warning("⚠️ Bitte geben Sie Dokumentinhalte ein.")
                     
         with tab3:
             st.subheader("Dokumente aus Datei hochladen")
-            uploaded_file = st.file_uploader(
-                "Datei auswählen", 
-                type=['txt', 'json'],
-                help="Unterstützte Formate: TXT (ein Dokument pro Zeile), JSON (Array von Strings)"
-            )
-            if uploaded_file and st.button("Datei verarbeiten", key="file_upload"):
+            with st.form("file_upload_form"):
+                uploaded_file = st.file_uploader(
+                    "Datei auswählen", 
+                    type=['txt', 'json'],
+                    help="Unterstützte Formate: TXT (ein Dokument pro Zeile), JSON (Array von Strings)"
+                )
+                submitted = st.form_submit_button("Datei verarbeiten", key="file_upload")
+            if submitted and uploaded_file:
                 try:
                     if uploaded_file.type == "text/plain":
                         content = str(uploaded_file.read(), "utf-8")
-                        docs_list = [doc.strip() for doc in content.split('\n') if doc.strip()]
+                        docs_list = split_documents(content)
                     elif uploaded_file.type == "application/json":
                         content = json.load(uploaded_file)
                         if isinstance(content, list):
-                            docs_list = [str(doc) for doc in content if str(doc).strip()]
+                            docs_list = list(filter(None, map(str.strip, map(str, content))))
                         else:
                             st.error("❌ JSON-Datei muss ein Array von Strings enthalten.")
                             return
@@ -124,18 +163,54 @@ class AdminView:
                         st.error("❌ Nicht unterstütztes Dateiformat.")
                         return
                         
+                    docs_list = self.deduplicate(docs_list)
                     if docs_list:
-                        st.session_state.chroma_client.store_data(docs_list)
-                        st.success(f"✅ {len(docs_list)} Dokumente aus Datei erfolgreich hinzugefügt!")
-                        st.session_state.documents_added += len(docs_list)
+                        added = self.store_in_batches(docs_list)
+                        self.report_added(added, len(docs_list))
                     else:
                         st.warning("⚠️ Keine gültigen Dokumente in der Datei gefunden.")
                         
                 except Exception as e:
                     st.error(f"❌ Fehler beim Verarbeiten der Datei: {str(e)}")
+            elif submitted:
+                st.warning("⚠️ Bitte wählen Sie zuerst eine Datei aus.")
                     
+    def deduplicate(self, docs_list):
+        """Entfernt doppelte Dokumente unter Beibehaltung der Reihenfolge."""
+        unique_docs = list(dict.fromkeys(docs_list))
+        dup_count = len(docs_list) - len(unique_docs)
+        if dup_count:
+            st.caption(f"{dup_count} Duplikate übersprungen")
+        return unique_docs
+        
+    def report_added(self, added, total):
+        """Meldet die Anzahl neu gespeicherter Dokumente und zählt sie für die Session."""
+        skipped = total - added
+        if skipped:
+            st.success(f"✅ {added} neue Dokumente hinzugefügt ({skipped} bereits vorhanden)")
+        else:
+            st.success(f"✅ {added} Dokumente erfolgreich hinzugefügt!")
+        st.session_state.documents_added += added
+        
+    def store_in_batches(self, docs_list):
+        """Speichert Dokumente in Batches von BATCH_SIZE, zeigt den Fortschritt an und gibt die Anzahl neuer Dokumente zurück."""
+        progress_bar = st.progress(0.0)
+        try:
+            # Der Writer puffert Teil-Batches dieses Uploads, flush() sendet den Rest
+            with self.chroma_client.batch_writer() as writer:
+                for i in range(0, len(docs_list), BATCH_SIZE):
+                    run_io(writer.add, docs_list[i:i + BATCH_SIZE])
+                    progress_bar.progress(min(i + BATCH_SIZE, len(docs_list)) / len(docs_list))
+                run_io(writer.flush)
+            return writer.added
+        finally:
+            cached_query.clear()
+            cached_query_many.clear()
+            cached_count.clear()
+            
+    @st.fragment
     def query_section(self):
-        """Sektion zum Abfragen der Datenbank."""
+        """Sektion zum Abfragen der Datenbank (als Fragment, Suchen lädt nur diese Sektion neu)."""
         st.header("🔍 Datenbank abfragen")
         
         if not st.session_state.connected:
@@ -152,15 +227,18 @@ class AdminView:
         if st.button("Suchen", key="search"):
             if query_text.strip():
                 try:
-                    results = st.session_state.chroma_client.query_data(query_text, n_results)
+                    results = cached_query(
+                        self.chroma_client, self.chroma_client.host, int(self.chroma_client.port),
+                        self.chroma_client.collection_name, query_text, n_results
+                    )
                     
-                    if results and 'documents' in results and results['documents'][0]:
+                    if results and results.get('documents'):
                         st.subheader("📋 Suchergebnisse:")
-                        for i, doc in enumerate(results['documents'][0], 1):
+                        for i, doc in enumerate(results['documents'], 1):
                             with st.expander(f"Ergebnis {i}"):
                                 st.write(doc)
-                                if 'distances' in results and results['distances'][0]:
-                                    st.caption(f"Distanz: {results['distances'][0][i-1]:.4f}")
+                                if results.get('distances'):
+                                    st.caption(f"Distanz: {results['distances'][i-1]:.4f}")
                     else:
                         st.info("📭 Keine Ergebnisse gefunden.")
                         
@@ -183,24 +261,36 @@ class AdminView:
             st.metric("Dokumente hinzugefügt (Session)", st.session_state.documents_added)
             
         with col2:
-            if st.button("Alle Daten anzeigen", key="show_all"):
-                try:
-                    all_data = st.session_state.chroma_client.show_all_data()
-                    if all_data and 'documents' in all_data and all_data['documents']:
-                        st.metric("Gesamt Dokumente", len(all_data['documents']))
-                        
-                        # Alle Dokumente anzeigen
-                        st.subheader("📄 Alle Dokumente:")
-                        for i, doc in enumerate(all_data['documents'], 1):
-                            with st.expander(f"Dokument {i} (ID: {all_data['ids'][i-1] if 'ids' in all_data else 'N/A'})"):
-                                st.write(doc)
-                    else:
-                        st.metric("Gesamt Dokumente", 0)
-                        st.info("📭 Keine Dokumente in der Datenbank.")
-                        
-                except Exception as e:
-                    st.error(f"❌ Fehler beim Laden der Daten: {str(e)}")
+            try:
+                total = cached_count(
+                    self.chroma_client, self.chroma_client.host, int(self.chroma_client.port),
+                    self.chroma_client.collection_name
+                )
+                st.metric("Gesamt Dokumente", total)
+                
+                if st.button("Dokumente auflisten", key="show_all"):
+                    st.session_state.show_all_data = True
                     
+                if not total:
+                    st.info("📭 Keine Dokumente in der Datenbank.")
+                elif st.session_state.show_all_data:
+                    # Nur die aktuelle Seite vom Server laden und als Tabelle anzeigen
+                    st.subheader("📄 Alle Dokumente:")
+                    max_pages = max(1, math.ceil(total / PAGE_SIZE))
+                    page = st.number_input("Seite", min_value=1, max_value=max_pages, value=1, key="overview_page")
+                    page_data = cached_show_all_data(
+                        self.chroma_client, self.chroma_client.host, int(self.chroma_client.port),
+                        self.chroma_client.collection_name, total,
+                        limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE
+                    )
+                    st.dataframe(
+                        {"ID": page_data['ids'], "Dokument": page_data['documents']},
+                        hide_index=True
+                    )
+                    
+            except Exception as e:
+                st.error(f"❌ Fehler beim Laden der Daten: {str(e)}")
+                
         with col3:
             st.button("🔄 Aktualisieren", key="refresh")
             
@@ -223,7 +313,7 @@ class AdminView:
         
         # Hauptbereich
         if st.session_state.connected:
-            self.chroma_client = st.session_state.chroma_client
+            self.chroma_client = get_chroma_client(*st.session_state.chroma_config)
             
         # Hauptsektionen
         self.add_documents_section()
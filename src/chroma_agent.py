@@ -1,12 +1,18 @@
 from google.adk.agents import Agent
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.adk.tools import FunctionTool
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types
 from chroma_interaction_class import ChromaInteractionClass
+from chroma_cache import cached_query, cached_query_many, cached_count
+import streamlit as st
 import os
 import asyncio
+import queue
+import threading
 import uuid
+import weakref
 
 # Global ChromaDB client reference
 _chroma_client = None
@@ -16,7 +22,7 @@ def set_chroma_client(client: ChromaInteractionClass):
     global _chroma_client
     _chroma_client = client
 
-def store_documents(documents: list[str]) -> dict:
+async def store_documents(documents: list[str]) -> dict:
     """Store documents in the ChromaDB collection.
     
     Args:
@@ -29,12 +35,20 @@ def store_documents(documents: list[str]) -> dict:
         return {"status": "error", "error_message": "ChromaDB client not initialized."}
     
     try:
-        _chroma_client.store_data(documents)
-        return {"status": "success", "message": f"Successfully stored {len(documents)} documents in ChromaDB."}
+        # Blocking HTTP calls run in a worker thread so they don't stall the runner's shared event loop
+        added = await asyncio.to_thread(_chroma_client.store_data, documents)
+        cached_query.clear()
+        cached_query_many.clear()
+        cached_count.clear()
+        skipped = len(documents) - added
+        message = f"Successfully stored {added} new documents in ChromaDB."
+        if skipped:
+            message += f" {skipped} were already stored."
+        return {"status": "success", "message": message}
     except Exception as e:
         return {"status": "error", "error_message": f"Error storing documents: {str(e)}"}
 
-def query_documents(query: str, n_results: int = 5) -> dict:
+async def query_documents(query: str, n_results: int = 5) -> dict:
     """Search and retrieve relevant documents from the ChromaDB collection.
     
     Args:
@@ -48,9 +62,12 @@ def query_documents(query: str, n_results: int = 5) -> dict:
         return {"status": "error", "error_message": "ChromaDB client not initialized."}
     
     try:
-        results = _chroma_client.query_data(query, n_results=n_results)
-        if results and 'documents' in results and results['documents'][0]:
-            docs = results['documents'][0]
+        results = await asyncio.to_thread(
+            cached_query, _chroma_client, _chroma_client.host, int(_chroma_client.port),
+            _chroma_client.collection_name, query, n_results
+        )
+        if results and results.get('documents'):
+            docs = results['documents']
             return {
                 "status": "success", 
                 "documents": docs,
@@ -65,6 +82,13 @@ def query_documents(query: str, n_results: int = 5) -> dict:
 store_tool = FunctionTool(store_documents)
 query_tool = FunctionTool(query_documents)
 
+def _run_loop(loop: asyncio.AbstractEventLoop):
+    """Thread target: run the loop until stop() is called, then close it."""
+    try:
+        loop.run_forever()
+    finally:
+        loop.close()
+
 class ChromaAgentRunner:
     """Runner wrapper for ChromaDB Agent following Google ADK pattern."""
     
@@ -104,6 +128,12 @@ You can use these tools as needed to help the user with document storage and ret
         self.user_id = f"user_{uuid.uuid4().hex[:8]}"
         self.session_id = f"session_{uuid.uuid4().hex[:8]}"
         
+        # Long-lived event loop on a background thread for all agent coroutines,
+        # stopped by close() or once the runner is garbage collected (e.g. evicted from the cache)
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=_run_loop, args=(self._loop,), daemon=True).start()
+        self._stop_loop = weakref.finalize(self, self._loop.call_soon_threadsafe, self._loop.stop)
+        
         # Session service and runner
         self.session_service = InMemorySessionService()
         self.runner = Runner(
@@ -116,55 +146,118 @@ You can use these tools as needed to help the user with document storage and ret
         self._initialize_session()
     
     def _initialize_session(self):
-        """Initialize the session asynchronously."""
-        async def init():
-            await self.session_service.create_session(
-                app_name=self.app_name,
-                user_id=self.user_id,
-                session_id=self.session_id
-            )
+        """Initialize the runner's default session on the persistent event loop."""
+        self._run_coroutine(self.session_service.create_session(
+            app_name=self.app_name,
+            user_id=self.user_id,
+            session_id=self.session_id
+        ))
+    
+    def create_session(self) -> str:
+        """Create a new conversation session on the shared runner and return its id."""
+        session_id = f"session_{uuid.uuid4().hex[:8]}"
+        self._run_coroutine(self.session_service.create_session(
+            app_name=self.app_name,
+            user_id=self.user_id,
+            session_id=session_id
+        ))
+        return session_id
+    
+    def delete_session(self, session_id: str):
+        """Delete a conversation session created by create_session() and free its history."""
+        self._run_coroutine(self.session_service.delete_session(
+            app_name=self.app_name,
+            user_id=self.user_id,
+            session_id=session_id
+        ))
+    
+    def close(self):
+        """Stop the runner's event loop and its thread."""
+        self._stop_loop()
+    
+    def _run_coroutine(self, coro):
+        """Run a coroutine on the runner's event loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+    
+    async def _send_message_async(self, content: types.Content, session_id: str) -> str:
+        """Run the agent on the event loop and return its final response."""
+        async for event in self.runner.run_async(
+            user_id=self.user_id,
+            session_id=session_id,
+            new_message=content
+        ):
+            if event.is_final_response():
+                return event.content.parts[0].text
         
-        # Run in event loop
+        return "No response received from agent."
+    
+    async def _stream_message_async(self, content: types.Content, session_id: str, chunks: queue.Queue):
+        """Run the agent with SSE streaming and put response text chunks on the queue."""
         try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            streamed = False
+            async for event in self.runner.run_async(
+                user_id=self.user_id,
+                session_id=session_id,
+                new_message=content,
+                run_config=RunConfig(streaming_mode=StreamingMode.SSE)
+            ):
+                if not (event.content and event.content.parts):
+                    continue
+                text = "".join(part.text for part in event.content.parts if part.text)
+                if event.partial:
+                    streamed = True
+                    chunks.put(text)
+                else:
+                    # The aggregated event repeats the streamed text, only emit it if nothing was streamed
+                    if event.is_final_response() and not streamed:
+                        chunks.put(text)
+                    streamed = False
+        finally:
+            chunks.put(None)
+    
+    def stream_message(self, message: str, session_id: str = None):
+        """Send a message to the agent and yield the response text as it is generated.
         
-        if loop.is_running():
-            # If loop is already running, we need to schedule it
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, init())
-                future.result()
-        else:
-            loop.run_until_complete(init())
+        Args:
+            message: User message text.
+            session_id: Conversation session from create_session() (default: the runner's own session).
+        """
+        content = types.Content(role='user', parts=[types.Part(text=message)])
+        chunks = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self._stream_message_async(content, session_id or self.session_id, chunks),
+            self._loop
+        )
+        while (chunk := chunks.get()) is not None:
+            yield chunk
+        # Re-raise errors from the agent run
+        future.result()
     
-    def send_message(self, message: str) -> str:
-        """Send a message to the agent and get response."""
+    def send_message(self, message: str, session_id: str = None) -> str:
+        """Send a message to the agent and get response.
+        
+        Args:
+            message: User message text.
+            session_id: Conversation session from create_session() (default: the runner's own session).
+        """
         try:
             # Create content
             content = types.Content(role='user', parts=[types.Part(text=message)])
             
-            # Run the agent
-            events = self.runner.run(
-                user_id=self.user_id,
-                session_id=self.session_id,
-                new_message=content
-            )
-            
-            # Extract final response
-            for event in events:
-                if event.is_final_response():
-                    return event.content.parts[0].text
-            
-            return "No response received from agent."
+            # Run the agent on the persistent loop
+            return self._run_coroutine(self._send_message_async(content, session_id or self.session_id))
                 
         except Exception as e:
             return f"Error processing message: {str(e)}"
 
-def create_chroma_agent(chroma_client: ChromaInteractionClass, model: str, instructions: str, api_key: str = None):
-    """Create a ChromaDB agent runner with the specified configuration."""
-    return ChromaAgentRunner(chroma_client, model, instructions, api_key)
+@st.cache_resource(max_entries=4, show_spinner=False)
+def create_chroma_agent(_chroma_client: ChromaInteractionClass, model: str, instructions: str, api_key: str = None):
+    """Create a ChromaDB agent runner with the specified configuration.
+    
+    The runner is cached per (model, instructions, api_key) and shared across reruns and sessions;
+    use create_session() to give each chat its own conversation. Only the most recent configurations
+    are kept, an evicted runner stops its event loop once no session uses it anymore.
+    """
+    return ChromaAgentRunner(_chroma_client, model, instructions, api_key)
     
     
\ No newline at end of file
@@ -0,0 +1,56 @@
+import streamlit as st
+from chroma_interaction_class import ChromaInteractionClass
+import concurrent.futures
+
+# Shared worker pool for blocking ChromaDB calls, bounds concurrent requests across all sessions
+_IO_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="chroma_io")
+
+
+def run_io(fn, *args, **kwargs):
+    """Run a blocking ChromaDB call on the shared I/O pool and wait for its result."""
+    return _IO_POOL.submit(fn, *args, **kwargs).result()
+
+
+@st.cache_resource(show_spinner=False)
+def get_chroma_client(host, port, collection_name, client_name):
+    """Create a connected ChromaDB client that is shared across all sessions and reruns."""
+    chroma_client = ChromaInteractionClass(host, port, collection_name, client_name)
+    chroma_client.connect()
+    return chroma_client
+
+
+@st.cache_data(ttl=300, max_entries=256, show_spinner=False)
+def cached_query(_chroma_client, host: str, port: int, collection_name: str, query_text: str, n_results: int):
+    """Query the collection, memoizing results per (host, port, collection, query, n_results).
+    
+    The leading underscore keeps the client itself out of the cache key,
+    host and port keep same-named collections on different servers apart.
+    """
+    return run_io(_chroma_client.query_one, query_text, n_results)
+
+
+@st.cache_data(ttl=300, max_entries=256, show_spinner=False)
+def cached_query_many(_chroma_client, host: str, port: int, collection_name: str, query_texts: tuple, n_results: int):
+    """Query the collection with several queries in one request, memoized like cached_query.
+    
+    query_texts is a tuple so it can be hashed, result lists follow its order.
+    """
+    return run_io(_chroma_client.query_data, list(query_texts), n_results)
+
+
+@st.cache_data(ttl=5, max_entries=64, show_spinner=False)
+def cached_count(_chroma_client, host: str, port: int, collection_name: str):
+    """Count the collection's documents, memoized briefly so reruns don't each hit the server.
+    
+    Cleared after every store, the short ttl covers writes from other sessions.
+    """
+    return run_io(_chroma_client.count_documents)
+
+
+@st.cache_data(ttl=60, max_entries=256, show_spinner=False)
+def cached_show_all_data(_chroma_client, host: str, port: int, collection_name: str, version: int, limit=None, offset=None):
+    """Fetch collection documents, memoized until the collection changes.
+    
+    version is a cheap change token such as the collection's document count.
+    """
+    return run_io(_chroma_client.show_all_data, limit=limit, offset=offset)
@@ -1,6 +1,12 @@
-import chromadb
 from functools import wraps
-import uuid
+import asyncio
+import hashlib
+import multiprocessing
+import random
+import threading
+import time
+
+_hash = hashlib.blake2b
 
 def require_connection(func):
     """
@@ -9,26 +15,141 @@ def require_connection(func):
     """
     @wraps(func)
     def wrapper(self, *args, **kwargs):
-        if not hasattr(self, 'connection') or self.connection is None:
+        if self.connection is None:
             raise ConnectionError(f"Not connected to collection '{self.collection_name}'. Please call connect() first.")
         return func(self, *args, **kwargs)
     return wrapper
 
+# HTTP clients shared by all instances, keyed by server,
+# so every ChromaInteractionClass for the same server reuses one keep-alive connection pool
+_CLIENTS = {}
+_REGISTRY_LOCK = threading.Lock()
+
+def _get_http_client(host, port):
+    """Return the shared chromadb.HttpClient for (host, port), creating it on first use."""
+    key = (host, int(port))
+    with _REGISTRY_LOCK:
+        if key not in _CLIENTS:
+            # chromadb is imported on first use, it is slow to import and not needed for the class definitions
+            import chromadb
+            _CLIENTS[key] = chromadb.HttpClient(host=host, port=port)
+        return _CLIENTS[key]
+
+def _make_id(document):
+    """Deterministic document id from its content, so re-ingesting a document doesn't duplicate it."""
+    return _hash(document.encode('utf-8'), digest_size=16).hexdigest()
+
+def _unique_by_id(documents, ids):
+    """Drop repeated ids within one request (ChromaDB rejects duplicate ids in a single add())."""
+    unique = dict(zip(ids, documents))
+    return list(unique.values()), list(unique)
+
+def _require_list(values, name):
+    """Reject a bare string, which would otherwise be iterated as one document or query per character."""
+    if isinstance(values, str):
+        raise TypeError(f"{name} must be a list of strings, not a single string")
+
+def _retryable_errors():
+    """Transient errors worth retrying: rate limits, server errors and connection problems."""
+    import httpx
+    from chromadb.errors import InternalError, RateLimitError
+    return (RateLimitError, InternalError, httpx.TransportError)
+
+def _with_retry(fn, *args, tries=5, base=0.1, **kwargs):
+    """Call fn, retrying transient errors with exponential backoff and jitter."""
+    retryable = _retryable_errors()
+    for attempt in range(tries):
+        try:
+            return fn(*args, **kwargs)
+        except retryable:
+            if attempt == tries - 1:
+                raise
+            time.sleep(base * 2 ** attempt + random.random() * base)
+
+async def _with_retry_async(fn, *args, tries=5, base=0.1, **kwargs):
+    """Async variant of _with_retry for coroutine functions."""
+    retryable = _retryable_errors()
+    for attempt in range(tries):
+        try:
+            return await fn(*args, **kwargs)
+        except retryable:
+            if attempt == tries - 1:
+                raise
+            await asyncio.sleep(base * 2 ** attempt + random.random() * base)
+
+def _store_shard(shard, host, port, collection_name, name, batch_size):
+    """Worker process entry point: store one shard with its own client and connection."""
+    client = ChromaInteractionClass(host, port, collection_name, name, batch_size)
+    client.connect()
+    return client.store_data(shard)
+
+class BatchWriter:
+    """Client-side write buffer for one ingest, sent to the server in batches of batch_size.
+    
+    Created by ChromaInteractionClass.batch_writer(). Documents leave the buffer only after their
+    add() succeeded, and leaving the with block with an exception doesn't flush.
+    `added` counts the documents that were new to the collection.
+    """
+    
+    def __init__(self, chroma_client):
+        self.chroma_client = chroma_client
+        self.added = 0
+        self._docs = []
+        self._ids = []
+        self._lock = threading.Lock()
+        
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        return False
+    
+    def add(self, documents):
+        """Buffer documents and send every full batch."""
+        _require_list(documents, "documents")
+        batch_size = self.chroma_client.batch_size
+        with self._lock:
+            self._docs.extend(documents)
+            self._ids.extend(map(_make_id, documents))
+            while len(self._docs) >= batch_size:
+                self._send(batch_size)
+                
+    def flush(self):
+        """Send all buffered documents."""
+        with self._lock:
+            while self._docs:
+                self._send(self.chroma_client.batch_size)
+                
+    def _send(self, n):
+        """Send the first n buffered documents in a single add() request. Caller holds _lock."""
+        self.added += self.chroma_client._add(self._docs[:n], self._ids[:n])
+        del self._docs[:n], self._ids[:n]
+
+
 class ChromaInteractionClass:
     """Class to interact with ChromaDB via HTTP."""
     
-    def __init__(self, host, port, collection_name, name):
+    def __init__(self, host, port, collection_name, name, batch_size=100):
         self.name = name
         self.host = host
         self.port = port
         self.collection_name = collection_name
         
-        # HTTP Client für Remote ChromaDB Server
-        self.client = chromadb.HttpClient(host=host, port=port)
+        # HTTP Client für Remote ChromaDB Server (shared per host/port)
+        self.client = _get_http_client(host, port)
         self.connection = None
         
+        # Documents are sent to the server in batches of batch_size (ChromaDB recommends 50-250)
+        self.batch_size = batch_size
+        
     def connect(self):
-        """Establish connection to the ChromaDB collection."""
+        """Establish connection to the ChromaDB collection.
+        
+        The handle is fetched on every call, so reconnecting picks up a collection that was
+        deleted and recreated on the server.
+        """
         self.connection = self.client.get_or_create_collection(name=self.collection_name)
         
     @require_connection
@@ -36,34 +157,229 @@ class ChromaInteractionClass:
         """
         Store documents in the connected collection.
         
-        Args: documents: List of strings (document content)
+        Documents are sent in batches of batch_size, one add() request per batch.
+        
+        Args:
+            documents: List of strings (document content)
+            
+        Returns:
+            Number of documents that were not in the collection yet
         """
-        if isinstance(documents, str):
-            documents = [documents]  # Convert single document to list
+        with self.batch_writer() as writer:
+            writer.add(documents)
+        return writer.added
         
-        # ChromaDB add() method expects specific parameters
-        self.connection.add(
-            documents=documents,
-            ids=[str(uuid.uuid4()) for _ in documents]
-        )
+    @require_connection
+    def batch_writer(self):
+        """Return a BatchWriter for an ingest that arrives in pieces.
+        
+        Full batches are sent as documents are added, the trailing partial batch on flush()
+        or when the with block exits normally. Each caller gets its own buffer.
+        """
+        return BatchWriter(self)
+    
+    @require_connection
+    def store_data_parallel(self, documents, workers=4):
+        """
+        Store documents from several processes at once, each with its own HTTP client.
+        
+        Documents are split into one contiguous shard per worker, and every worker writes its
+        shard in batches of batch_size. Meant for bulk ingests where a single client is GIL-bound.
+        
+        Args:
+            documents: List of strings (document content)
+            workers: Number of worker processes (default: 4)
+            
+        Returns:
+            Number of documents that were not in the collection yet
+        """
+        _require_list(documents, "documents")
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}")
+        shard_size = -(-len(documents) // workers)  # ceil division
+        if not shard_size:
+            return 0
+        shards = [documents[i:i + shard_size] for i in range(0, len(documents), shard_size)]
+        # spawn instead of fork, the calling process (e.g. Streamlit) runs several threads
+        with multiprocessing.get_context("spawn").Pool(len(shards)) as pool:
+            return sum(pool.starmap(_store_shard, [
+                (shard, self.host, self.port, self.collection_name, f"{self.name}-{i}", self.batch_size)
+                for i, shard in enumerate(shards)
+            ]))
+    
+    def _add(self, documents, ids):
+        """Send the documents not yet in the collection in a single add() request.
+        
+        Returns the number of documents added.
+        """
+        if not documents:
+            return 0
+        documents, ids = _unique_by_id(documents, ids)
+        # Ids are content hashes, an existing id means the document is already stored
+        existing = set(_with_retry(self.connection.get, ids=ids, include=[])["ids"])
+        new = [(doc, id_) for doc, id_ in zip(documents, ids) if id_ not in existing]
+        if new:
+            documents, ids = map(list, zip(*new))
+            # ChromaDB add() method expects specific parameters
+            _with_retry(self.connection.add, documents=documents, ids=ids)
+        return len(new)
         
     @require_connection
     def query_data(self, query_texts, n_results=10):
         """Query data from the connected collection.
         
+        Prefer passing all queries as one list: they are embedded and searched in a single
+        request, and the result lists are indexed in the same order as query_texts.
+        
         Args:
-            query_texts: List of query strings or single query string
-            n_results: Number of results to return (default: 10)
+            query_texts: List of query strings
+            n_results: Number of results to return per query (default: 10)
         """
-        if isinstance(query_texts, str):
-            query_texts = [query_texts]
-            
-        return self.connection.query(
+        _require_list(query_texts, "query_texts")
+        return _with_retry(
+            self.connection.query,
             query_texts=query_texts,
             n_results=n_results
         )
+        
+    def store_one(self, document):
+        """Store a single document in the connected collection.
+        
+        Returns 1 if it was new to the collection, 0 if it was already stored.
+        """
+        return self.store_data([document])
+        
+    def query_one(self, query_text, n_results=10):
+        """Query the connected collection with a single query string.
+        
+        Returns the results for this query only, e.g. result['documents'] is a flat list of documents.
+        """
+        results = self.query_data([query_text], n_results)
+        return {key: results[key][0] for key in ("ids", "documents", "metadatas", "distances") if results.get(key)}
+
+    @require_connection
+    def show_all_data(self, limit=None, offset=None):
+        """Show all data in the connected collection.
+        
+        Only ids and documents are fetched, embeddings are left on the server.
+        
+        Args:
+            limit: Maximum number of documents to return (default: all)
+            offset: Number of documents to skip (default: 0)
+        """
+        return self.connection.get(limit=limit, offset=offset, include=["documents"])
+
+    @require_connection
+    def count_documents(self):
+        """Return the number of documents in the connected collection."""
+        return self.connection.count()
+
 
+class AChromaInteractionClass:
+    """Async variant of ChromaInteractionClass built on chromadb.AsyncHttpClient."""
+    
+    def __init__(self, host, port, collection_name, name, batch_size=100, embedding_function=None):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        
+        # Optional client-side embedder for astore_many (e.g. chromadb's DefaultEmbeddingFunction());
+        # it must match the collection's embedding function so queries stay comparable
+        self.embedding_function = embedding_function
+        
+        # Async HTTP Client, created on connect() because it has to be awaited
+        self.client = None
+        self.connection = None
+        
+    async def connect(self):
+        """Establish connection to the ChromaDB collection."""
+        if self.client is None:
+            import chromadb
+            self.client = await chromadb.AsyncHttpClient(host=self.host, port=self.port)
+        self.connection = await self.client.get_or_create_collection(name=self.collection_name)
+        
+    @require_connection
+    async def aadd(self, documents, embeddings=None):
+        """Store the documents not yet in the connected collection in a single add() request.
+        
+        Args:
+            documents: List of strings (document content)
+            embeddings: Precomputed embeddings, one per document (documents must then be unique)
+            
+        Returns:
+            Number of documents that were not in the collection yet
+        """
+        _require_list(documents, "documents")
+        by_id = None if embeddings is None else dict(zip(map(_make_id, documents), embeddings))
+        documents, ids = await self._anew(documents)
+        await self._aadd(documents, ids, None if by_id is None else [by_id[id_] for id_ in ids])
+        return len(ids)
+        
+    async def _anew(self, documents):
+        """Return the unique documents that aren't in the collection yet, with their ids."""
+        documents, ids = _unique_by_id(documents, list(map(_make_id, documents)))
+        if not ids:
+            return [], []
+        # Ids are content hashes, an existing id means the document is already stored
+        existing = set((await _with_retry_async(self.connection.get, ids=ids, include=[]))["ids"])
+        new = [(doc, id_) for doc, id_ in zip(documents, ids) if id_ not in existing]
+        return [doc for doc, _ in new], [id_ for _, id_ in new]
+        
+    async def _aadd(self, documents, ids, embeddings=None):
+        """Send documents with their ids (and embeddings) in a single add() request."""
+        if not documents:
+            return
+        if embeddings is None:
+            await _with_retry_async(self.connection.add, documents=documents, ids=ids)
+        else:
+            await _with_retry_async(self.connection.add, documents=documents, embeddings=embeddings, ids=ids)
+        
     @require_connection
-    def show_all_data(self):
-        """Show all data in the connected collection."""
-        return self.connection.get()
\ No newline at end of file
+    async def aquery(self, query_texts, n_results=10):
+        """Query data from the connected collection.
+        
+        Args:
+            query_texts: List of query strings
+            n_results: Number of results to return (default: 10)
+        """
+        _require_list(query_texts, "query_texts")
+        return await _with_retry_async(
+            self.connection.query,
+            query_texts=query_texts,
+            n_results=n_results
+        )
+        
+    @require_connection
+    async def astore_many(self, documents, concurrency=8):
+        """Store documents in batches of batch_size with up to `concurrency` add() requests in flight.
+        
+        With an embedding_function, each batch is embedded in a worker thread while other batches
+        upload, and documents are sorted by length so batches need little padding. Documents already
+        in the collection are skipped before embedding, so re-ingesting costs no embedding work.
+        
+        Args:
+            documents: List of strings (document content)
+            concurrency: Maximum number of batches embedded or uploaded at once (default: 8)
+            
+        Returns:
+            Number of documents that were not in the collection yet
+        """
+        _require_list(documents, "documents")
+        if self.embedding_function is not None:
+            documents = sorted(dict.fromkeys(documents), key=len, reverse=True)
+        batches = [documents[i:i + self.batch_size] for i in range(0, len(documents), self.batch_size)]
+        semaphore = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+        
+        async def store_batch(batch):
+            async with semaphore:
+                batch, ids = await self._anew(batch)
+                embeddings = None
+                if batch and self.embedding_function is not None:
+                    embeddings = await loop.run_in_executor(None, self.embedding_function, batch)
+                await self._aadd(batch, ids, embeddings)
+                return len(ids)
+                
+        return sum(await asyncio.gather(*(store_batch(batch) for batch in batches)))
@@ -1,7 +1,21 @@
 import streamlit as st
-import json
-from datetime import datetime
-from chroma_interaction_class import ChromaInteractionClass
+import orjson
+import time
+from datetime import datetime, timezone
+from chroma_cache import get_chroma_client, cached_count, cached_query_many, cached_show_all_data
+
+# Number of most recent chat messages rendered on every rerun
+RECENT_MESSAGES = 50
+
+# Number of documents shown per query in the quick search
+QUICK_SEARCH_RESULTS = 3
+
+
+def format_time(message):
+    """Return the message time as HH:MM:SS, formatted on first use and cached on the message."""
+    if "ts_str" not in message:
+        message["ts_str"] = datetime.fromtimestamp(message["ts_ns"] / 1e9).strftime('%H:%M:%S')
+    return message["ts_str"]
 
 
 class ChatView:
@@ -17,14 +31,17 @@ class ChatView:
             st.session_state.chat_messages = []
         if 'chroma_connected' not in st.session_state:
             st.session_state.chroma_connected = False
-        if 'chroma_client' not in st.session_state:
-            st.session_state.chroma_client = None
         if 'agent' not in st.session_state:
             st.session_state.agent = None
+        if 'agent_session_id' not in st.session_state:
+            st.session_state.agent_session_id = None
+        if 'welcome_shown' not in st.session_state:
+            st.session_state.welcome_shown = False
+        if 'quick_search_open' not in st.session_state:
+            st.session_state.quick_search_open = False
             
-        # Auto-initialize ChromaDB connection if not already done
-        if not st.session_state.chroma_connected and st.session_state.chroma_client is None:
-            self.auto_connect_chroma()
+        # Auto-initialize ChromaDB connection (the client is a cached resource shared by all sessions)
+        self.auto_connect_chroma()
             
     def auto_connect_chroma(self):
         """Automatically connect to ChromaDB with default settings."""
@@ -35,12 +52,8 @@ class ChatView:
             collection_name = "documents"
             client_name = "chat_client"
             
-            # Create ChromaDB client
-            self.chroma_client = ChromaInteractionClass(host, port, collection_name, client_name)
-            self.chroma_client.connect()
-            
-            # Store in session state
-            st.session_state.chroma_client = self.chroma_client
+            # Get the shared ChromaDB client
+            self.chroma_client = get_chroma_client(host, port, collection_name, client_name)
             st.session_state.chroma_connected = True
             
         except Exception as e:
@@ -107,20 +120,21 @@ class ChatView:
                 from chroma_agent import create_chroma_agent
                 
                 # Debug: Check if chroma_client exists
-                if not st.session_state.chroma_client:
+                if not self.chroma_client:
                     st.sidebar.error("❌ ChromaDB client not found. Please restart the app.")
                     return
                 
                 # Create agent with the correct Google ADK pattern
                 self.agent = create_chroma_agent(
-                    chroma_client=st.session_state.chroma_client,
+                    _chroma_client=self.chroma_client,
                     model=model_name,
                     instructions=system_prompt,
                     api_key=api_key
                 )
                 
-                # Store in session state
+                # Store in session state with a conversation of its own
                 st.session_state.agent = self.agent
+                st.session_state.agent_session_id = self.agent.create_session()
                 
                 st.sidebar.success("✅ Agent initialized successfully!")
                 
@@ -128,10 +142,11 @@ class ChatView:
                 welcome_msg = {
                     "role": "assistant",
                     "content": "🤖 Hello! I'm your ChromaDB assistant. I can help you store and query documents from your knowledge base. I'm connected to localhost:8000/documents and ready to help!",
-                    "timestamp": datetime.now()
+                    "ts_ns": time.time_ns()
                 }
-                if not any(msg.get("content") == welcome_msg["content"] for msg in st.session_state.chat_messages):
+                if not st.session_state.welcome_shown:
                     st.session_state.chat_messages.append(welcome_msg)
+                    st.session_state.welcome_shown = True
                 
             except Exception as e:
                 st.sidebar.error(f"❌ Error initializing agent: {str(e)}")
@@ -140,7 +155,11 @@ class ChatView:
         if st.session_state.agent:
             st.sidebar.success("🤖 Agent Ready")
             if st.sidebar.button("🔄 Reset Agent", key="reset_agent"):
+                # Free this chat's conversation on the shared runner
+                if st.session_state.agent_session_id:
+                    st.session_state.agent.delete_session(st.session_state.agent_session_id)
                 st.session_state.agent = None
+                st.session_state.agent_session_id = None
                 st.sidebar.info("Agent reset")
         else:
             st.sidebar.warning("🤖 Agent Not Initialized")
@@ -160,6 +179,13 @@ class ChatView:
             """
         )
         
+    def render_message(self, message):
+        """Render a single chat message with its time."""
+        with st.chat_message(message["role"]):
+            st.write(message["content"])
+            if "ts_ns" in message:
+                st.caption(f"⏰ {format_time(message)}")
+                
     def chat_interface(self):
         """Main chat interface."""
         st.header("💬 ChromaDB AI Assistant")
@@ -178,63 +204,65 @@ class ChatView:
         # Get current agent from session state
         if st.session_state.agent:
             self.agent = st.session_state.agent
-            self.chroma_client = st.session_state.chroma_client
         
-        # Display chat messages
+        # Display chat messages, older ones only on request
+        older = st.session_state.chat_messages[:-RECENT_MESSAGES]
+        recent = st.session_state.chat_messages[-RECENT_MESSAGES:]
         chat_container = st.container()
         with chat_container:
-            for message in st.session_state.chat_messages:
-                with st.chat_message(message["role"]):
-                    st.write(message["content"])
-                    if "timestamp" in message:
-                        st.caption(f"⏰ {message['timestamp'].strftime('%H:%M:%S')}")
+            if older and st.toggle(f"Show {len(older)} older messages", key="show_old"):
+                for message in older:
+                    self.render_message(message)
+            for message in recent:
+                self.render_message(message)
         
-        # Chat input
+        # Chat input, rendered inline inside the fragment, so new messages go into chat_container above it
         if prompt := st.chat_input("Ask me anything about your documents..."):
             # Add user message
             user_msg = {
                 "role": "user",
                 "content": prompt,
-                "timestamp": datetime.now()
+                "ts_ns": time.time_ns()
             }
             st.session_state.chat_messages.append(user_msg)
             
             # Display user message
-            with st.chat_message("user"):
+            with chat_container.chat_message("user"):
                 st.write(prompt)
-                st.caption(f"⏰ {user_msg['timestamp'].strftime('%H:%M:%S')}")
+                st.caption(f"⏰ {format_time(user_msg)}")
             
             # Generate agent response
-            with st.chat_message("assistant"):
-                with st.spinner("🤖 Thinking..."):
-                    try:
-                        # Use the ChromaAgentRunner to send message
-                        response_text = self.agent.send_message(prompt)
-                        
-                        # Display response
+            with chat_container.chat_message("assistant"):
+                try:
+                    # Stream the response from the ChromaAgentRunner as it is generated
+                    response_text = st.write_stream(
+                        self.agent.stream_message(prompt, st.session_state.agent_session_id)
+                    )
+                    if not response_text:
+                        response_text = "No response received from agent."
                         st.write(response_text)
-                        
-                        # Add assistant message
-                        assistant_msg = {
-                            "role": "assistant", 
-                            "content": response_text,
-                            "timestamp": datetime.now()
-                        }
-                        st.session_state.chat_messages.append(assistant_msg)
-                        st.caption(f"⏰ {assistant_msg['timestamp'].strftime('%H:%M:%S')}")
-                        
-                    except Exception as e:
-                        error_msg = f"❌ Error: {str(e)}"
-                        st.error(error_msg)
-                        
-                        # Add error message
-                        error_assistant_msg = {
-                            "role": "assistant",
-                            "content": error_msg,
-                            "timestamp": datetime.now()
-                        }
-                        st.session_state.chat_messages.append(error_assistant_msg)
-                        
+                    
+                    # Add assistant message
+                    assistant_msg = {
+                        "role": "assistant", 
+                        "content": response_text,
+                        "ts_ns": time.time_ns()
+                    }
+                    st.session_state.chat_messages.append(assistant_msg)
+                    st.caption(f"⏰ {format_time(assistant_msg)}")
+                    
+                except Exception as e:
+                    error_msg = f"❌ Error: {str(e)}"
+                    st.error(error_msg)
+                    
+                    # Add error message
+                    error_assistant_msg = {
+                        "role": "assistant",
+                        "content": error_msg,
+                        "ts_ns": time.time_ns()
+                    }
+                    st.session_state.chat_messages.append(error_assistant_msg)
+                    
     def quick_actions(self):
         """Quick action buttons for common tasks."""
         if not st.session_state.chroma_connected or not st.session_state.agent:
@@ -247,15 +275,23 @@ class ChatView:
         with col1:
             if st.button("📄 View All Documents", key="view_all"):
                 try:
-                    all_data = self.chroma_client.show_all_data()
-                    if all_data and 'documents' in all_data:
-                        count = len(all_data['documents'])
+                    # Count is O(1) on the server and doubles as version token for the cached preview
+                    count = cached_count(
+                        self.chroma_client, self.chroma_client.host, int(self.chroma_client.port),
+                        self.chroma_client.collection_name
+                    )
+                    if count:
+                        # Only the first 5 documents cross the wire
+                        preview = cached_show_all_data(
+                            self.chroma_client, self.chroma_client.host, int(self.chroma_client.port),
+                            self.chroma_client.collection_name, count, limit=5
+                        )
                         quick_msg = {
                             "role": "assistant",
                             "content": f"📊 Database contains {count} documents.\n\n" + 
-                                     "\n".join([f"**Doc {i+1}:** {doc[:100]}..." 
-                                              for i, doc in enumerate(all_data['documents'][:5])]),
-                            "timestamp": datetime.now()
+                                     "\n".join(f"**Doc {i}:** {doc[:100]}…" 
+                                              for i, doc in enumerate(preview['documents'], 1)),
+                            "ts_ns": time.time_ns()
                         }
                         st.session_state.chat_messages.append(quick_msg)
                         st.rerun()
@@ -266,15 +302,35 @@ class ChatView:
         
         with col2:
             if st.button("🔍 Search Documents", key="quick_search"):
-                search_query = st.text_input("Enter search query:", key="quick_search_input")
-                if search_query:
-                    quick_msg = {
-                        "role": "user",
-                        "content": f"Search for: {search_query}",
-                        "timestamp": datetime.now()
-                    }
-                    st.session_state.chat_messages.append(quick_msg)
-                    st.rerun()
+                st.session_state.quick_search_open = not st.session_state.quick_search_open
+            # The form stays open across reruns, so the queries are read on the submit rerun
+            if st.session_state.quick_search_open:
+                with st.form("quick_search_form"):
+                    search_input = st.text_area("Enter search queries (one per line):", key="quick_search_input")
+                    submitted = st.form_submit_button("Search")
+                queries = [q for q in map(str.strip, search_input.splitlines()) if q]
+                if submitted and queries:
+                    try:
+                        # All queries go to ChromaDB in a single batched request
+                        results = cached_query_many(
+                            self.chroma_client, self.chroma_client.host, int(self.chroma_client.port),
+                            self.chroma_client.collection_name, tuple(queries), QUICK_SEARCH_RESULTS
+                        )
+                        quick_msg = {
+                            "role": "assistant",
+                            "content": "\n\n".join(
+                                f"🔍 **{query}**\n" + ("\n".join(f"- {doc[:100]}…" for doc in docs) or "No documents found.")
+                                for query, docs in zip(queries, results['documents'])
+                            ),
+                            "ts_ns": time.time_ns()
+                        }
+                        st.session_state.chat_messages.append(quick_msg)
+                        st.session_state.quick_search_open = False
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Error searching documents: {e}")
+                elif submitted:
+                    st.warning("Please enter at least one search query.")
         
         with col3:
             if st.button("📝 Add Document", key="quick_add"):
@@ -283,7 +339,7 @@ class ChatView:
                     quick_msg = {
                         "role": "user", 
                         "content": f"Store this document: {doc_content}",
-                        "timestamp": datetime.now()
+                        "ts_ns": time.time_ns()
                     }
                     st.session_state.chat_messages.append(quick_msg)
                     st.rerun()
@@ -291,6 +347,7 @@ class ChatView:
         with col4:
             if st.button("🗑️ Clear Chat", key="clear_chat"):
                 st.session_state.chat_messages = []
+                st.session_state.welcome_shown = False
                 st.rerun()
                 
     def export_chat(self):
@@ -298,27 +355,42 @@ class ChatView:
         if st.session_state.chat_messages:
             st.subheader("💾 Export Chat")
             
-            # Prepare export data
+            # Prepare export data (orjson serializes datetimes as ISO 8601 itself)
             export_data = {
                 "chat_history": [
                     {
                         "role": msg["role"],
                         "content": msg["content"],
-                        "timestamp": msg["timestamp"].isoformat() if "timestamp" in msg else None
+                        "timestamp": datetime.fromtimestamp(msg["ts_ns"] / 1e9, tz=timezone.utc) if "ts_ns" in msg else None
                     }
                     for msg in st.session_state.chat_messages
                 ],
-                "exported_at": datetime.now().isoformat()
+                "exported_at": datetime.now(timezone.utc)
             }
             
             # Download button
             st.download_button(
                 label="📥 Download Chat History",
-                data=json.dumps(export_data, indent=2),
+                data=orjson.dumps(export_data, option=orjson.OPT_INDENT_2),
                 file_name=f"chat_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                 mime="application/json"
             )
             
+    @st.fragment
+    def chat_section(self):
+        """Chat area as a fragment so chat interactions don't rerun the sidebar setup."""
+        # Main chat interface
+        self.chat_interface()
+        
+        # Quick actions
+        st.markdown("---")
+        self.quick_actions()
+        
+        # Export functionality
+        if st.session_state.chat_messages:
+            st.markdown("---")
+            self.export_chat()
+            
     def run(self):
         """Main method to run the chat interface."""
         st.set_page_config(
@@ -336,17 +408,8 @@ class ChatView:
         # Setup sidebar
         self.agent_setup()
         
-        # Main chat interface
-        self.chat_interface()
-        
-        # Quick actions
-        st.markdown("---")
-        self.quick_actions()
-        
-        # Export functionality
-        if st.session_state.chat_messages:
-            st.markdown("---")
-            self.export_chat()
+        # Chat, quick actions and export
+        self.chat_section()
 
 
 if __name__ == "__main__":
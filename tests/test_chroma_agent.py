@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import weakref
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("google.adk")
+pytest.importorskip("streamlit")
+
+import chroma_agent  # noqa: E402
+from chroma_agent import ChromaAgentRunner  # noqa: E402
+
+
+def event(*texts, partial=False, final=False):
+    """Fake ADK event; a None text stands for a non-text part such as a function call."""
+    parts = [SimpleNamespace(text=text) for text in texts]
+    return SimpleNamespace(content=SimpleNamespace(parts=parts), partial=partial, is_final_response=lambda: final)
+
+
+@pytest.fixture
+def make_runner():
+    """Build a ChromaAgentRunner around a fake ADK runner that replays a fixed event sequence."""
+    runners = []
+
+    def make(events):
+        agent_runner = ChromaAgentRunner.__new__(ChromaAgentRunner)
+        agent_runner.user_id = "user"
+        agent_runner.session_id = "session"
+        agent_runner._loop = asyncio.new_event_loop()
+        threading.Thread(target=chroma_agent._run_loop, args=(agent_runner._loop,), daemon=True).start()
+        agent_runner._stop_loop = weakref.finalize(
+            agent_runner, agent_runner._loop.call_soon_threadsafe, agent_runner._loop.stop
+        )
+
+        async def run_async(**kwargs):
+            for e in events:
+                yield e
+
+        agent_runner.runner = SimpleNamespace(run_async=run_async)
+        runners.append(agent_runner)
+        return agent_runner
+
+    yield make
+    for agent_runner in runners:
+        agent_runner.close()
+
+
+def test_partial_chunks_are_not_repeated_by_the_final_aggregate(make_runner):
+    runner = make_runner([
+        event("Hel", partial=True),
+        event("lo", partial=True),
+        event("Hello", final=True),
+    ])
+    assert "".join(runner.stream_message("hi")) == "Hello"
+
+
+def test_final_event_without_partials_is_emitted(make_runner):
+    runner = make_runner([event("Hello", final=True)])
+    assert "".join(runner.stream_message("hi")) == "Hello"
+
+
+def test_tool_call_between_text_segments(make_runner):
+    runner = make_runner([
+        event("Let me ", partial=True),
+        event("check. ", partial=True),
+        # Aggregate of the first segment together with the function call, not final
+        event("Let me check. ", None),
+        # Function response
+        event(None),
+        event("Found ", partial=True),
+        event("it.", partial=True),
+        event("Found it.", final=True),
+    ])
+    assert "".join(runner.stream_message("hi")) == "Let me check. Found it."
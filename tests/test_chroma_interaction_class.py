@@ -0,0 +1,257 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import chroma_interaction_class as cic
+from chroma_interaction_class import AChromaInteractionClass, ChromaInteractionClass, _make_id, _unique_by_id
+
+
+class FakeCollection:
+    """In-memory stand-in for a chromadb collection, records every add() request."""
+
+    def __init__(self):
+        self.docs = {}
+        self.add_calls = []
+
+    def add(self, documents, ids):
+        assert len(ids) == len(set(ids)), "duplicate ids in one add()"
+        self.add_calls.append(list(documents))
+        self.docs.update(zip(ids, documents))
+
+    def get(self, ids=None, include=None, limit=None, offset=None):
+        found = [id_ for id_ in ids if id_ in self.docs]
+        return {"ids": found}
+
+    def query(self, query_texts, n_results):
+        docs = list(self.docs.values())[:n_results]
+        return {
+            "ids": [[_make_id(doc) for doc in docs] for _ in query_texts],
+            "documents": [docs for _ in query_texts],
+            "metadatas": None,
+            "distances": [[0.0] * len(docs) for _ in query_texts],
+        }
+
+
+class AsyncFakeCollection(FakeCollection):
+    """Async counterpart of FakeCollection, also records the embeddings it receives."""
+
+    def __init__(self):
+        super().__init__()
+        self.embeddings = {}
+
+    async def add(self, documents, ids, embeddings=None):
+        super().add(documents, ids)
+        if embeddings is not None:
+            self.embeddings.update(zip(ids, embeddings))
+
+    async def get(self, ids=None, include=None, limit=None, offset=None):
+        return super().get(ids=ids, include=include, limit=limit, offset=offset)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(cic, "_get_http_client", lambda host, port: None)
+    monkeypatch.setattr(cic, "_retryable_errors", lambda: ())
+    client = ChromaInteractionClass("localhost", 8000, "documents", "test", batch_size=3)
+    client.connection = FakeCollection()
+    return client
+
+
+def test_make_id_is_deterministic_per_content():
+    assert _make_id("a") == _make_id("a")
+    assert _make_id("a") != _make_id("b")
+    assert len(_make_id("a")) == 32
+
+
+def test_unique_by_id_keeps_first_occurrence_order():
+    docs = ["a", "b", "a", "c"]
+    assert _unique_by_id(docs, list(map(_make_id, docs))) == (
+        ["a", "b", "c"], [_make_id("a"), _make_id("b"), _make_id("c")]
+    )
+
+
+def test_store_data_sends_batches_of_batch_size(client):
+    assert client.store_data(list("abcdefg")) == 7
+    assert client.connection.add_calls == [["a", "b", "c"], ["d", "e", "f"], ["g"]]
+
+
+def test_store_data_counts_only_new_documents(client):
+    client.store_one("a")
+    assert client.store_data(["a", "b", "b"]) == 1
+    assert client.store_one("b") == 0
+    assert client.connection.add_calls == [["a"], ["b"]]
+
+
+def test_store_data_rejects_a_single_string(client):
+    with pytest.raises(TypeError):
+        client.store_data("abc")
+    with pytest.raises(TypeError):
+        client.query_data("abc")
+    assert client.connection.add_calls == []
+
+
+def test_batch_writer_buffers_partial_batch_until_flush(client):
+    writer = client.batch_writer()
+    writer.add(["a", "b"])
+    assert client.connection.add_calls == []
+    writer.add(["c", "d"])
+    assert client.connection.add_calls == [["a", "b", "c"]]
+    writer.flush()
+    assert client.connection.add_calls == [["a", "b", "c"], ["d"]]
+    assert writer.added == 4
+
+
+def test_batch_writer_flushes_on_exit(client):
+    with client.batch_writer() as writer:
+        writer.add(["a"])
+    assert client.connection.add_calls == [["a"]]
+
+
+def test_batch_writer_does_not_flush_on_exception(client):
+    with pytest.raises(RuntimeError):
+        with client.batch_writer() as writer:
+            writer.add(["a"])
+            raise RuntimeError
+    assert client.connection.add_calls == []
+
+
+def test_batch_writer_keeps_documents_when_add_fails(client):
+    writer = client.batch_writer()
+    writer.add(["a", "b"])
+
+    def fail(documents, ids):
+        raise RuntimeError
+
+    client.connection.add = fail
+    with pytest.raises(RuntimeError):
+        writer.flush()
+    del client.connection.add
+    writer.flush()
+    assert client.connection.add_calls == [["a", "b"]]
+
+
+def test_query_one_flattens_single_query_results(client):
+    client.store_data(["a", "b"])
+    result = client.query_one("x", n_results=5)
+    assert result["documents"] == ["a", "b"]
+    assert result["ids"] == [_make_id("a"), _make_id("b")]
+    assert "metadatas" not in result
+
+
+def test_methods_require_connection(client):
+    client.connection = None
+    with pytest.raises(ConnectionError):
+        client.store_data(["a"])
+
+
+def test_store_data_parallel_rejects_zero_workers(client):
+    with pytest.raises(ValueError):
+        client.store_data_parallel(["a"], workers=0)
+    assert client.store_data_parallel([], workers=2) == 0
+
+
+def test_astore_many_embeds_only_new_documents(monkeypatch):
+    monkeypatch.setattr(cic, "_retryable_errors", lambda: ())
+    embedded = []
+
+    def embed(batch):
+        embedded.extend(batch)
+        return [[float(len(doc))] for doc in batch]
+
+    client = AChromaInteractionClass("localhost", 8000, "documents", "test", batch_size=2, embedding_function=embed)
+    client.connection = AsyncFakeCollection()
+
+    assert asyncio.run(client.astore_many(["a", "bb", "ccc"])) == 3
+    assert sorted(embedded) == ["a", "bb", "ccc"]
+    assert client.connection.embeddings[_make_id("bb")] == [2.0]
+
+    embedded.clear()
+    assert asyncio.run(client.astore_many(["a", "bb", "dddd"])) == 1
+    assert embedded == ["dddd"]
+
+
+def test_aadd_counts_only_new_documents(monkeypatch):
+    monkeypatch.setattr(cic, "_retryable_errors", lambda: ())
+    client = AChromaInteractionClass("localhost", 8000, "documents", "test")
+    client.connection = AsyncFakeCollection()
+
+    assert asyncio.run(client.aadd(["a", "b", "a"])) == 2
+    assert asyncio.run(client.aadd(["a", "c"], embeddings=[[1.0], [2.0]])) == 1
+    assert client.connection.embeddings == {_make_id("c"): [2.0]}
+
+
+@pytest.fixture
+def retry_env(monkeypatch):
+    """chromadb's error module plus the backoff sleeps, which are recorded instead of slept."""
+    errors = pytest.importorskip("chromadb.errors")
+    sleeps = []
+
+    async def async_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(cic.time, "sleep", sleeps.append)
+    monkeypatch.setattr(cic.asyncio, "sleep", async_sleep)
+    return SimpleNamespace(errors=errors, sleeps=sleeps)
+
+
+def flaky(*failures, result="ok"):
+    """Return a function that raises the given errors in order, then returns result."""
+    remaining = list(failures)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if remaining:
+            raise remaining.pop(0)
+        return result
+
+    fn.calls = calls
+    return fn
+
+
+def test_with_retry_succeeds_after_rate_limit(retry_env):
+    fn = flaky(retry_env.errors.RateLimitError("slow down"), retry_env.errors.RateLimitError("slow down"))
+    assert cic._with_retry(fn) == "ok"
+    assert len(fn.calls) == 3
+    assert len(retry_env.sleeps) == 2
+
+
+def test_with_retry_raises_non_retryable_error_immediately(retry_env):
+    fn = flaky(retry_env.errors.ChromaError("bad request"))
+    with pytest.raises(retry_env.errors.ChromaError):
+        cic._with_retry(fn)
+    assert len(fn.calls) == 1
+    assert retry_env.sleeps == []
+
+
+def test_with_retry_reraises_last_error_after_all_tries(retry_env):
+    errors = [retry_env.errors.RateLimitError(f"attempt {i}") for i in range(3)]
+    fn = flaky(*errors)
+    with pytest.raises(retry_env.errors.RateLimitError) as excinfo:
+        cic._with_retry(fn, tries=3)
+    assert excinfo.value is errors[-1]
+    assert len(fn.calls) == 3
+    assert len(retry_env.sleeps) == 2
+
+
+def test_with_retry_async_retries_and_reraises(retry_env):
+    def as_coroutine(fn):
+        async def call():
+            return fn()
+        return call
+
+    fn = flaky(retry_env.errors.RateLimitError("slow down"))
+    assert asyncio.run(cic._with_retry_async(as_coroutine(fn))) == "ok"
+    assert len(fn.calls) == 2
+
+    fn = flaky(retry_env.errors.ChromaError("bad request"))
+    with pytest.raises(retry_env.errors.ChromaError):
+        asyncio.run(cic._with_retry_async(as_coroutine(fn)))
+    assert len(fn.calls) == 1
+
+    errors = [retry_env.errors.RateLimitError(f"attempt {i}") for i in range(2)]
+    fn = flaky(*errors)
+    with pytest.raises(retry_env.errors.RateLimitError) as excinfo:
+        asyncio.run(cic._with_retry_async(as_coroutine(fn), tries=2))
+    assert excinfo.value is errors[-1]